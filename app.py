@@ -1,30 +1,96 @@
 from __future__ import annotations
 
+import hashlib
+import logging
+import queue
+from contextlib import asynccontextmanager
+from logging.handlers import QueueHandler, QueueListener
+from collections.abc import AsyncIterator
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
-from dotenv import load_dotenv
 
+# Импорт config загружает .env до чтения конфигурации
+import config  # noqa: F401
+import rutube_downloader
 from routes.video import router as video_router
+from services.video_service import VideoService
 
-# Загружаем переменные окружения из .env файла
-load_dotenv()
 
-app = FastAPI(title="RuTube Video Downloader API")
+def _install_queue_logging() -> QueueListener | None:
+    """
+    Переводит логирование на QueueHandler + QueueListener.
 
-# Подключаем статические файлы
+    Запись в stdout уходит в фоновый поток, и конкурентные загрузки не
+    конкурируют за лок stdout внутри event loop.
+    """
+    root = logging.getLogger()
+    handlers = root.handlers[:]
+    if not handlers or any(isinstance(h, QueueHandler) for h in handlers):
+        return None
+    log_queue: queue.Queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    root.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    return listener
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Создает один экземпляр VideoService на весь процесс."""
+    listener = _install_queue_logging()
+    app.state.video_service = VideoService()
+    yield
+    # Закрываем общую HTTP-сессию и браузер загрузчика
+    await rutube_downloader.close_session()
+    await rutube_downloader.close_browser()
+    if listener is not None:
+        listener.stop()
+
+
+app = FastAPI(title="RuTube Video Downloader API", lifespan=lifespan)
+
+# Подключаем статические файлы; существование директории проверено здесь,
+# поэтому per-request проверку внутри StaticFiles отключаем
 static_dir = Path(__file__).parent / "static"
 if static_dir.exists():
-    app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+    app.mount(
+        "/static",
+        StaticFiles(directory=str(static_dir), check_dir=False),
+        name="static",
+    )
+
+
+@app.middleware("http")
+async def static_cache_headers(request: Request, call_next):
+    """Добавляет долгий Cache-Control для статики, разгружая повторные запросы."""
+    response = await call_next(request)
+    if request.url.path.startswith("/static/"):
+        response.headers["Cache-Control"] = "public, max-age=86400, immutable"
+    return response
+
+# Кэшируем index.html в памяти: корневой эндпоинт дергается на каждую
+# загрузку страницы, и open/fstat на каждый запрос не нужны
+_index_path = static_dir / "index.html"
+_index_bytes = _index_path.read_bytes() if _index_path.exists() else None
+_index_etag = hashlib.md5(_index_bytes).hexdigest() if _index_bytes is not None else None
 
 
 @app.get("/")
-async def read_root() -> FileResponse:
+async def read_root(request: Request) -> Response:
     """Главная страница приложения."""
-    index_path = static_dir / "index.html"
-    return FileResponse(index_path)
+    if _index_bytes is None:
+        # Статика не собрана — отдаем файл напрямую (получим 500/404 как раньше)
+        return FileResponse(_index_path)
+    if request.headers.get("if-none-match") == _index_etag:
+        return Response(status_code=304)
+    return Response(
+        _index_bytes,
+        media_type="text/html",
+        headers={"ETag": _index_etag, "Cache-Control": "public, max-age=60"},
+    )
 
 
 # Регистрация роутов
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Загружаем переменные окружения из .env файла до чтения конфигурации
+load_dotenv()
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Неизменяемая конфигурация процесса, читается из env один раз."""
+
+    download_dir: Path
+    file_unused_ttl_seconds: float
+
+
+def _resolve_download_dir() -> Path:
+    """
+    Определяет директорию для загрузки файлов.
+
+    Директория из DOWNLOAD_PATH при необходимости создается и проверяется
+    пробной записью — и роуты, и сервис видят один и тот же результат.
+
+    Returns:
+        Path к директории загрузки
+    """
+    download_path = os.getenv("DOWNLOAD_PATH")
+    download_dir = None
+
+    if download_path:
+        download_dir = Path(download_path)
+        try:
+            # Создаем директорию, если она не существует
+            download_dir.mkdir(parents=True, exist_ok=True)
+            # Проверяем, что директория доступна для записи
+            test_file = download_dir / ".write_test"
+            test_file.touch()
+            test_file.unlink()
+        except (OSError, PermissionError):
+            # Директория недоступна, используем /tmp
+            download_dir = None
+
+    if download_dir is None:
+        # Используем /tmp как fallback, если DOWNLOAD_PATH не задан или недоступен
+        download_dir = Path("/tmp")
+        download_dir.mkdir(parents=True, exist_ok=True)
+
+    return download_dir
+
+
+def _resolve_file_unused_ttl_seconds() -> float:
+    """
+    Читает время жизни неиспользованного файла в секундах из переменной окружения.
+
+    Файл будет автоматически удален, если его не скачали в течение этого времени.
+
+    Returns:
+        Время жизни файла в секундах (по умолчанию 180 секунд = 3 минуты)
+    """
+    # Сначала проверяем новую переменную FILE_UNUSED_TTL_MINUTES
+    ttl_minutes = os.getenv("FILE_UNUSED_TTL_MINUTES")
+
+    # Если не задана, проверяем старую переменную для обратной совместимости
+    if ttl_minutes is None:
+        ttl_minutes = os.getenv("FILE_TTL_MINUTES", "3")
+
+    try:
+        ttl_minutes = float(ttl_minutes)
+        if ttl_minutes <= 0:
+            ttl_minutes = 3
+    except (ValueError, TypeError):
+        ttl_minutes = 3
+    return ttl_minutes * 60  # Конвертируем минуты в секунды
+
+
+def _build_config() -> Config:
+    """Собирает конфигурацию из переменных окружения."""
+    return Config(
+        download_dir=_resolve_download_dir(),
+        file_unused_ttl_seconds=_resolve_file_unused_ttl_seconds(),
+    )
+
+
+# Единственный объект конфигурации на процесс
+CONFIG = _build_config()
+
+
+def reload_config() -> Config:
+    """Пересобирает конфигурацию из текущего env (используется в тестах)."""
+    global CONFIG
+    CONFIG = _build_config()
+    return CONFIG
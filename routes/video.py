@@ -1,92 +1,183 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import logging
 import os
+import re
+import stat as stat_module
 import time
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Annotated, Any
 
 from fastapi import (
     APIRouter,
     BackgroundTasks,
+    Depends,
     HTTPException,
     Query,
     Request,
+    Response,
     WebSocket,
     WebSocketDisconnect,
 )
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse
+import anyio.to_thread
+import orjson
 
+import config
 from services.video_service import VideoService
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/v1", tags=["video"])
 
+# URL должен начинаться со схемы и хоста rutube.ru: якорный матч отсекает
+# подделки вида https://evil.com/?rutube.ru, в отличие от substring-проверки
+_RUTUBE_RE = re.compile(r"^https?://(?:[a-z0-9-]+\.)?rutube\.ru/", re.IGNORECASE)
+
+
+def get_video_service(request: Request) -> VideoService:
+    """Возвращает общий для процесса экземпляр VideoService из app.state."""
+    return request.app.state.video_service
+
+
+async def _ws_send_json(websocket: WebSocket, payload: dict[str, Any]) -> None:
+    """
+    Отправляет JSON-сообщение в WebSocket, сериализуя через orjson.
+
+    Starlette'овский send_json использует stdlib json.dumps; orjson (C)
+    заметно дешевле при сотнях статус-сообщений на загрузку. Клиент ждет
+    текстовые фреймы, поэтому декодируем байты в str.
+    """
+    await websocket.send_text(orjson.dumps(payload).decode())
+
+
+def _iter_mp4(directory: Path) -> Iterator[tuple[str, int, float]]:
+    """
+    Обходит директорию одним вызовом os.scandir и возвращает .mp4 файлы.
+
+    Каждая запись читается ровно одним stat-вызовом (вместо трех при
+    использовании glob + Path.stat), что важно для директорий с тысячами файлов.
+
+    Args:
+        directory: Директория для обхода
+
+    Yields:
+        Кортежи (имя файла, размер в байтах, время модификации)
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".mp4"):
+                continue
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            st = entry.stat()
+            yield entry.name, st.st_size, st.st_mtime
+
+
+async def _async_unlink(path: Path) -> None:
+    """Удаляет файл в worker-потоке, не блокируя event loop."""
+    await anyio.to_thread.run_sync(lambda: path.unlink(missing_ok=True))
+
+
+def _bulk_unlink(paths: list[Path]) -> None:
+    """
+    Удаляет файлы из списка, игнорируя уже отсутствующие.
+
+    Выполняется как фоновая задача после отправки ответа, чтобы не
+    блокировать обработчик на syscall'ах unlink.
+
+    Args:
+        paths: Список путей к файлам для удаления
+    """
+    for path in paths:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception:
+            # Игнорируем ошибки при удалении (файл может быть занят)
+            pass
+
 
 def get_download_directory() -> Path:
     """
     Возвращает директорию для загрузки файлов.
-    
+
     Returns:
         Path к директории загрузки
     """
-    download_path = os.getenv("DOWNLOAD_PATH")
-    download_dir = None
+    return config.CONFIG.download_dir
+
 
-    if download_path:
-        download_dir = Path(download_path)
-        # Проверяем, что директория существует и доступна
-        if not download_dir.exists() or not download_dir.is_dir():
-            download_dir = None
+# Таймеры отложенного удаления по имени файла; позволяют отменить удаление,
+# когда клиент успел забрать файл до истечения TTL
+_deletion_timers: dict[str, asyncio.TimerHandle] = {}
 
-    if download_dir is None:
-        # Используем /tmp как fallback, если DOWNLOAD_PATH не задан или недоступен
-        download_dir = Path("/tmp")
+# Индекс живых файлов (имя в нижнем регистре -> Path), пополняется при
+# завершении загрузки; позволяет искать файл без обхода директории
+_live_files: dict[str, Path] = {}
 
-    return download_dir
 
+def register_live_file(file_path: Path) -> None:
+    """Добавляет скачанный файл в индекс для быстрого поиска по имени."""
+    _live_files[file_path.name.lower()] = file_path
 
-async def schedule_file_deletion(file_path: Path, delay_seconds: float) -> None:
+
+def forget_live_file(filename: str) -> None:
+    """Убирает файл из индекса (при удалении или истечении TTL)."""
+    _live_files.pop(filename.lower(), None)
+
+
+def _on_ttl_expired(file_path: Path) -> None:
+    """Callback таймера: удаляет файл по истечении TTL."""
+    _deletion_timers.pop(file_path.name, None)
+    forget_live_file(file_path.name)
+    # Callback выполняется в потоке event loop, поэтому сам unlink
+    # уводим в executor
+    asyncio.get_running_loop().run_in_executor(None, _bulk_unlink, [file_path])
+
+
+def schedule_file_deletion(file_path: Path, delay_seconds: float) -> None:
     """
     Планирует удаление файла через указанное время.
 
+    Использует loop.call_later вместо долгоживущей sleep-корутины: таймер
+    хранит только TimerHandle в куче событийного цикла, а не стек корутины.
+
     Args:
         file_path: Путь к файлу для удаления
         delay_seconds: Задержка в секундах перед удалением
     """
-    await asyncio.sleep(delay_seconds)
-    # Проверяем, что файл все еще существует перед удалением
-    if file_path.exists() and file_path.is_file():
-        try:
-            file_path.unlink(missing_ok=True)
-        except Exception:
-            # Игнорируем ошибки при удалении (файл может быть занят)
-            pass
+    handle = asyncio.get_running_loop().call_later(
+        delay_seconds, _on_ttl_expired, file_path
+    )
+    _deletion_timers[file_path.name] = handle
+
+
+def cancel_file_deletion(filename: str) -> None:
+    """Отменяет запланированное удаление файла, если оно есть."""
+    handle = _deletion_timers.pop(filename, None)
+    if handle is not None:
+        handle.cancel()
 
 
 def get_file_unused_ttl_seconds() -> float:
     """
-    Получает время жизни неиспользованного файла в секундах из переменной окружения.
-    
+    Возвращает время жизни неиспользованного файла в секундах.
+
     Файл будет автоматически удален, если его не скачали в течение этого времени.
 
     Returns:
         Время жизни файла в секундах (по умолчанию 180 секунд = 3 минуты)
     """
-    # Сначала проверяем новую переменную FILE_UNUSED_TTL_MINUTES
-    ttl_minutes = os.getenv("FILE_UNUSED_TTL_MINUTES")
-    
-    # Если не задана, проверяем старую переменную для обратной совместимости
-    if ttl_minutes is None:
-        ttl_minutes = os.getenv("FILE_TTL_MINUTES", "3")
-    
-    try:
-        ttl_minutes = float(ttl_minutes)
-        if ttl_minutes <= 0:
-            ttl_minutes = 3
-    except (ValueError, TypeError):
-        ttl_minutes = 3
-    return ttl_minutes * 60  # Конвертируем минуты в секунды
+    return config.CONFIG.file_unused_ttl_seconds
+
+
+def invalidate_config() -> None:
+    """Пересобирает конфигурацию (используется в тестах при смене env)."""
+    config.reload_config()
 
 
 @router.get("/")
@@ -98,37 +189,45 @@ async def root() -> dict[str, str]:
 @router.get("/download")
 async def download_video(
     url: Annotated[str, Query(description="URL видео с RuTube")],
+    video_service: Annotated[VideoService, Depends(get_video_service)],
+    background_tasks: BackgroundTasks,
     file_name: Annotated[
         str | None,
         Query(description="Имя файла (без расширения, будет сохранено как .mp4)"),
     ] = None,
-) -> StreamingResponse:
+) -> FileResponse:
     """
-    Скачивает видео с RuTube и возвращает его как поток.
+    Скачивает видео с RuTube и возвращает его как файл.
 
     Args:
         url: URL видео с RuTube (например, https://rutube.ru/video/...)
         file_name: Опциональное имя файла (без расширения, будет сохранено как .mp4)
 
     Returns:
-        StreamingResponse с видеофайлом в формате MP4
+        FileResponse с видеофайлом в формате MP4
     """
-    video_service = VideoService()
+    # Отсеиваем неверные URL до запуска сервиса
+    if not _RUTUBE_RE.match(url):
+        raise HTTPException(
+            status_code=400,
+            detail="Неверный URL. Ожидается URL с rutube.ru"
+        )
 
     try:
         # Скачиваем видео через сервис
         video_path = await video_service.download_and_get_path(url, None, file_name)
 
-        # Создаем генератор для потоковой передачи файла
-        stream_generator = video_service.create_stream_generator(video_path)
-
-        # Возвращаем потоковый ответ
-        return StreamingResponse(
-            stream_generator,
+        # FileResponse отдает файл через sendfile (zero-copy), после отправки
+        # файл удаляется (однократное скачивание)
+        background_tasks.add_task(_async_unlink, video_path)
+        return FileResponse(
+            video_path,
             media_type="video/mp4",
-            headers={
-                "Content-Disposition": f'attachment; filename="{video_path.name}"'
-            }
+            filename=video_path.name,
+            # Content-Length приходит из stat; явный Accept-Ranges позволяет
+            # клиентам дозакачивать файл Range-запросами после обрыва
+            headers={"Accept-Ranges": "bytes"},
+            background=background_tasks,
         )
 
     except ValueError as e:
@@ -137,11 +236,8 @@ async def download_video(
             detail=str(e)
         )
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
         error_msg = str(e) if str(e) else type(e).__name__
-        print(f"Ошибка в эндпоинте /download: {error_msg}")
-        print(f"Traceback:\n{error_details}")
+        logger.exception("Ошибка в эндпоинте /download: %s", error_msg)
         raise HTTPException(
             status_code=500,
             detail=f"Ошибка при обработке запроса: {error_msg}"
@@ -149,54 +245,57 @@ async def download_video(
 
 
 @router.get("/files")
-async def list_files() -> dict[str, list[dict[str, Any]]]:
+async def list_files(background_tasks: BackgroundTasks) -> dict[str, list[dict[str, Any]]]:
     """
     Возвращает список всех доступных видеофайлов с информацией о них.
-    
+
     Returns:
         Словарь с массивом файлов, каждый содержит name, size, created_at
     """
     download_dir = get_download_directory()
     ttl_seconds = get_file_unused_ttl_seconds()
     current_time = time.time()
-    
-    files = []
-    
-    try:
-        # Получаем все .mp4 файлы в директории
-        for file_path in download_dir.glob("*.mp4"):
-            if not file_path.is_file():
-                continue
-                
+    cutoff = current_time - ttl_seconds
+
+    def _scan() -> tuple[list[dict[str, Any]], list[Path]]:
+        """Синхронный обход директории, выполняется в worker-потоке."""
+        files: list[dict[str, Any]] = []
+        to_delete: list[Path] = []
+        # Один проход по директории, один stat на файл
+        for name, size, mtime in _iter_mp4(download_dir):
             # Проверяем, не истекло ли время жизни файла
-            file_age = current_time - file_path.stat().st_mtime
-            if file_age > ttl_seconds:
-                # Файл слишком старый, удаляем его
-                try:
-                    file_path.unlink(missing_ok=True)
-                except Exception:
-                    pass
+            if mtime < cutoff:
+                # Файл слишком старый, удалим его после отправки ответа
+                to_delete.append(download_dir / name)
                 continue
-            
-            file_info = {
-                "name": file_path.name,
-                "size": file_path.stat().st_size,
-                "created_at": file_path.stat().st_mtime,
-                "age_seconds": file_age,
-            }
-            files.append(file_info)
+
+            files.append({
+                "name": name,
+                "size": size,
+                "created_at": mtime,
+                "age_seconds": current_time - mtime,
+            })
+        return files, to_delete
+
+    try:
+        # Обход директории блокирует, поэтому уводим его с event loop
+        files, to_delete = await anyio.to_thread.run_sync(_scan)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Ошибка при получении списка файлов: {str(e)}"
         )
-    
+
+    if to_delete:
+        background_tasks.add_task(anyio.to_thread.run_sync, _bulk_unlink, to_delete)
+
     return {"files": files}
 
 
 @router.get("/files/search")
 async def search_file_by_name(
-    name: Annotated[str, Query(description="Часть имени файла для поиска (case-insensitive)")]
+    name: Annotated[str, Query(description="Часть имени файла для поиска (case-insensitive)")],
+    background_tasks: BackgroundTasks,
 ) -> dict[str, list[dict[str, Any]]]:
     """
     Ищет файлы по частичному совпадению имени.
@@ -210,45 +309,46 @@ async def search_file_by_name(
     download_dir = get_download_directory()
     ttl_seconds = get_file_unused_ttl_seconds()
     current_time = time.time()
-    
+    cutoff = current_time - ttl_seconds
+
     search_name_lower = name.lower()
-    found_files = []
-    
-    try:
-        # Ищем все .mp4 файлы, содержащие указанное имя
-        for file_path in download_dir.glob("*.mp4"):
-            if not file_path.is_file():
-                continue
-            
-            file_name_lower = file_path.name.lower()
-            
+
+    def _scan() -> tuple[list[dict[str, Any]], list[Path]]:
+        """Синхронный поиск по директории, выполняется в worker-потоке."""
+        found_files: list[dict[str, Any]] = []
+        to_delete: list[Path] = []
+        # Один проход по директории, один stat на файл
+        for file_name, size, mtime in _iter_mp4(download_dir):
             # Проверяем, содержит ли имя файла искомую строку
-            if search_name_lower not in file_name_lower:
+            if search_name_lower not in file_name.lower():
                 continue
-                
+
             # Проверяем, не истекло ли время жизни файла
-            file_age = current_time - file_path.stat().st_mtime
-            if file_age > ttl_seconds:
-                # Файл слишком старый, удаляем его
-                try:
-                    file_path.unlink(missing_ok=True)
-                except Exception:
-                    pass
+            if mtime < cutoff:
+                # Файл слишком старый, удалим его после отправки ответа
+                to_delete.append(download_dir / file_name)
                 continue
-            
-            file_info = {
-                "name": file_path.name,
-                "size": file_path.stat().st_size,
-                "created_at": file_path.stat().st_mtime,
-                "age_seconds": file_age,
-            }
-            found_files.append(file_info)
+
+            found_files.append({
+                "name": file_name,
+                "size": size,
+                "created_at": mtime,
+                "age_seconds": current_time - mtime,
+            })
+        return found_files, to_delete
+
+    try:
+        # Обход директории блокирует, поэтому уводим его с event loop
+        found_files, to_delete = await anyio.to_thread.run_sync(_scan)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Ошибка при поиске файлов: {str(e)}"
         )
-    
+
+    if to_delete:
+        background_tasks.add_task(anyio.to_thread.run_sync, _bulk_unlink, to_delete)
+
     return {"files": found_files}
 
 
@@ -259,7 +359,7 @@ async def get_downloaded_file(
     request: Request,
     background_tasks: BackgroundTasks,
     search: Annotated[bool, Query(description="Если True, ищет файл по частичному совпадению имени")] = False
-) -> FileResponse:
+) -> Response:
     """
     Возвращает ранее скачанный видеофайл по имени.
 
@@ -271,26 +371,33 @@ async def get_downloaded_file(
     Поддерживает GET и HEAD методы для проверки доступности файла.
     """
     download_dir = get_download_directory()
-    
+    file_size: int | None = None
+
     # Если включен режим поиска, ищем файл по частичному совпадению
     if search:
         filename_lower = filename.lower()
         file_path = None
         ttl_seconds = get_file_unused_ttl_seconds()
-        current_time = time.time()
-        
-        # Ищем первый подходящий файл
-        for path in download_dir.glob("*.mp4"):
-            if not path.is_file():
-                continue
-            
-            if filename_lower in path.name.lower():
-                # Проверяем, не истекло ли время жизни файла
-                file_age = current_time - path.stat().st_mtime
-                if file_age <= ttl_seconds:
-                    file_path = path
-                    filename = path.name  # Обновляем filename для ответа
-                    break
+        cutoff = time.time() - ttl_seconds
+
+        # Сначала ищем в индексе живых файлов — без syscall'ов
+        for key, path in _live_files.items():
+            if filename_lower in key:
+                file_path = path
+                filename = path.name  # Обновляем filename для ответа
+                break
+
+        if file_path is None:
+            # Fallback: один проход по директории (файлы, созданные вне индекса)
+            def _find() -> Path | None:
+                for file_name, _size, mtime in _iter_mp4(download_dir):
+                    if filename_lower in file_name.lower() and mtime >= cutoff:
+                        return download_dir / file_name
+                return None
+
+            file_path = await anyio.to_thread.run_sync(_find)
+            if file_path is not None:
+                filename = file_path.name  # Обновляем filename для ответа
         
         if file_path is None:
             raise HTTPException(status_code=404, detail=f"Файл, содержащий '{filename}', не найден")
@@ -298,35 +405,63 @@ async def get_downloaded_file(
         # Точное совпадение имени файла
         file_path = download_dir / filename
 
-        if not file_path.exists() or not file_path.is_file():
+        def _probe() -> os.stat_result | None:
+            """Один stat вместо exists+is_file+stat, в worker-потоке."""
+            try:
+                return file_path.stat()
+            except OSError:
+                return None
+
+        st = await anyio.to_thread.run_sync(_probe)
+        if st is None or not stat_module.S_ISREG(st.st_mode):
             raise HTTPException(status_code=404, detail="Файл не найден")
+        file_size = st.st_size
 
         # Проверяем, не истекло ли время жизни файла
         ttl_seconds = get_file_unused_ttl_seconds()
-        file_age = time.time() - file_path.stat().st_mtime
+        file_age = time.time() - st.st_mtime
         if file_age > ttl_seconds:
-            # Файл слишком старый, удаляем его
-            try:
-                file_path.unlink(missing_ok=True)
-            except Exception:
-                pass
+            # Файл слишком старый, удаляем его (в worker-потоке)
+            await anyio.to_thread.run_sync(_bulk_unlink, [file_path])
             raise HTTPException(status_code=404, detail="Файл не найден")
 
-    # Для HEAD запросов просто возвращаем информацию о файле без удаления
+    # Для HEAD запросов возвращаем только заголовки из одного stat'а,
+    # не поднимая sendfile-механику FileResponse
     if request.method == "HEAD":
+        if file_size is None:
+            file_size = (await anyio.to_thread.run_sync(file_path.stat)).st_size
+        return Response(
+            status_code=200,
+            headers={
+                "Content-Length": str(file_size),
+                "Content-Type": "video/mp4",
+                "Accept-Ranges": "bytes",
+                "Content-Disposition": f'attachment; filename="{filename}"',
+            },
+        )
+
+    # Range-запросы (докачка, параллельные чанки, перемотка <video>) отдаются
+    # как 206 самим FileResponse; файл при этом не удаляем — клиент придет
+    # за остальными диапазонами, TTL-таймер остается единственным чистильщиком
+    if request.headers.get("range"):
         return FileResponse(
             file_path,
             media_type="video/mp4",
             filename=filename,
+            headers={"Accept-Ranges": "bytes"},
         )
 
-    # Для GET запросов удаляем файл сразу после отправки (однократное скачивание)
-    background_tasks.add_task(file_path.unlink, missing_ok=True)
+    # Для обычных GET удаляем файл сразу после отправки (однократное скачивание).
+    # Отменяем TTL-таймер, чтобы он не удалил файл во время отдачи
+    cancel_file_deletion(file_path.name)
+    forget_live_file(file_path.name)
+    background_tasks.add_task(_async_unlink, file_path)
 
     return FileResponse(
         file_path,
         media_type="video/mp4",
         filename=filename,
+        headers={"Accept-Ranges": "bytes"},
         background=background_tasks,
     )
 
@@ -349,12 +484,12 @@ async def download_video_status(websocket: WebSocket) -> None:
     try:
         # Получаем URL из первого сообщения
         data = await websocket.receive_text()
-        message = json.loads(data)
+        message = orjson.loads(data)
         url = message.get("url")
         file_name = message.get("file_name")
 
         if not url:
-            await websocket.send_json({
+            await _ws_send_json(websocket, {
                 "status": "error",
                 "progress": None,
                 "message": "URL не указан в сообщении"
@@ -363,8 +498,8 @@ async def download_video_status(websocket: WebSocket) -> None:
             return
 
         # Валидация URL
-        if "rutube.ru" not in url:
-            await websocket.send_json({
+        if not _RUTUBE_RE.match(url):
+            await _ws_send_json(websocket, {
                 "status": "error",
                 "progress": None,
                 "message": "Неверный URL. Ожидается URL с rutube.ru"
@@ -372,17 +507,65 @@ async def download_video_status(websocket: WebSocket) -> None:
             await websocket.close()
             return
 
-        # Создаем callback для отправки статуса через WebSocket
+        # Ограниченная очередь дает обратное давление: если клиент читает
+        # медленно, producer (загрузчик) блокируется на put, а не копит
+        # неотправленные фреймы в памяти event loop
+        # None — сентинел завершения: pump дошлет всё из очереди и выйдет
+        status_queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(maxsize=20)
+
         async def status_callback(status_data: dict[str, str | float | None]) -> None:
             """Callback для отправки статуса через WebSocket."""
-            try:
-                await websocket.send_json(status_data)
-            except Exception:
-                # Если WebSocket закрыт, просто игнорируем ошибку
-                pass
-
-        # Создаем сервис и начинаем загрузку
-        video_service = VideoService()
+            await status_queue.put(status_data)
+
+        async def pump_status() -> None:
+            """
+            Отправляет статусы из очереди, коалесцируя прогресс.
+
+            Из накопившихся прогресс-сообщений уходит только последнее
+            (не чаще раза в ~100 мс); терминальные error/completed
+            отправляются всегда. По сентинелу None досылает остаток
+            очереди и завершается.
+            """
+            finished = False
+            while not finished:
+                batch = [await status_queue.get()]
+                while True:
+                    try:
+                        batch.append(status_queue.get_nowait())
+                    except asyncio.QueueEmpty:
+                        break
+                if batch[-1] is None:
+                    finished = True
+                    batch.pop()
+
+                to_send = []
+                last_progress = None
+                for msg in batch:
+                    if msg.get("status") in ("error", "completed"):
+                        if last_progress is not None:
+                            to_send.append(last_progress)
+                            last_progress = None
+                        to_send.append(msg)
+                    else:
+                        last_progress = msg
+                if last_progress is not None:
+                    to_send.append(last_progress)
+
+                for msg in to_send:
+                    try:
+                        await _ws_send_json(websocket, msg)
+                    except Exception:
+                        # Клиент отключился: продолжаем потреблять очередь,
+                        # чтобы загрузчик не завис на put
+                        pass
+
+                if not finished:
+                    await asyncio.sleep(0.1)
+
+        drain_task = asyncio.create_task(pump_status())
+
+        # Используем общий для процесса сервис и начинаем загрузку
+        video_service: VideoService = websocket.app.state.video_service
 
         try:
             # Скачиваем видео с отправкой статуса
@@ -398,17 +581,19 @@ async def download_video_status(websocket: WebSocket) -> None:
             actual_file_path = str(video_path)
 
             # Логируем для отладки
-            print(f"DEBUG: video_path = {video_path}")
-            print(f"DEBUG: actual_filename = {actual_filename}")
-            print(f"DEBUG: file_name (requested) = {file_name}")
+            logger.debug("video_path = %s", video_path)
+            logger.debug("actual_filename = %s", actual_filename)
+            logger.debug("file_name (requested) = %s", file_name)
 
             # Планируем автоматическое удаление файла, если он не был скачан
             # через указанное время (FILE_UNUSED_TTL_MINUTES, по умолчанию 3 минуты)
             ttl_seconds = get_file_unused_ttl_seconds()
-            asyncio.create_task(schedule_file_deletion(video_path, ttl_seconds))
+            register_live_file(video_path)
+            schedule_file_deletion(video_path, ttl_seconds)
 
-            # Отправляем финальный статус об успешном завершении
-            # Используем актуальное имя файла из пути
+            # Отправляем финальный статус об успешном завершении через ту же
+            # очередь, что и прогресс: терминальный фрейм не может обогнать
+            # еще не отправленные промежуточные статусы
             websocket_message = {
                 "status": "completed",
                 "progress": 100,
@@ -416,24 +601,33 @@ async def download_video_status(websocket: WebSocket) -> None:
                 "file_id": actual_filename,
                 "file_path": actual_file_path,
             }
-            print(f"DEBUG: Sending WebSocket message: {websocket_message}")
-            await websocket.send_json(websocket_message)
+            logger.debug("Sending WebSocket message: %s", websocket_message)
+            await status_queue.put(websocket_message)
 
         except ValueError as e:
-            await websocket.send_json({
+            await status_queue.put({
                 "status": "error",
                 "progress": None,
                 "message": str(e)
             })
         except Exception as e:
-            await websocket.send_json({
+            await status_queue.put({
                 "status": "error",
                 "progress": None,
                 "message": f"Ошибка при обработке запроса: {str(e)}"
             })
+        finally:
+            # Сентинел идет после терминального фрейма: pump дошлет всё,
+            # что есть в очереди, и завершится сам — cancel не оборвет
+            # уже вынутое, но еще не отправленное сообщение
+            await status_queue.put(None)
+            try:
+                await asyncio.wait_for(drain_task, timeout=5)
+            except asyncio.TimeoutError:
+                drain_task.cancel()
 
-    except json.JSONDecodeError:
-        await websocket.send_json({
+    except orjson.JSONDecodeError:
+        await _ws_send_json(websocket, {
             "status": "error",
             "progress": None,
             "message": "Неверный формат JSON в сообщении"
@@ -443,7 +637,7 @@ async def download_video_status(websocket: WebSocket) -> None:
         pass
     except Exception as e:
         try:
-            await websocket.send_json({
+            await _ws_send_json(websocket, {
                 "status": "error",
                 "progress": None,
                 "message": f"Неожиданная ошибка: {str(e)}"
@@ -1,31 +1,217 @@
 from __future__ import annotations
 
 import asyncio
+import logging
 import re
 import sys
+import time
 from pathlib import Path
 from typing import Any, Callable, Awaitable
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin
 
+import aiohttp
 import m3u8
-import requests
+import orjson
 from playwright.async_api import async_playwright, Page
 from tqdm import tqdm
 
+logger = logging.getLogger(__name__)
+
+# Количество одновременных скачиваний сегментов
+DOWNLOAD_CONCURRENCY = 16
+
+# Сегменты меньше этого размера не имеет смысла делить Range-запросами
+RANGE_SPLIT_THRESHOLD = 2 * 1024 * 1024
+
+class _NullBar:
+    """Заглушка вместо tqdm, когда вывода в терминал нет (сервисный режим)."""
+
+    def __init__(self) -> None:
+        self.n = 0
+
+    def update(self, n: int = 1) -> None:
+        self.n += n
+
+    def __enter__(self) -> "_NullBar":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        pass
+
+
+def _progress_bar(total: int) -> tqdm | _NullBar:
+    """tqdm в интерактивном запуске, no-op счетчик под FastAPI/в пайпе."""
+    if sys.stdout.isatty():
+        return tqdm(total=total, desc="Скачивание", unit="сегмент")
+    return _NullBar()
+
+
+SEGMENT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Referer": "https://rutube.ru/",
+}
+
+# Одна сессия на процесс: переиспользование TCP/TLS-соединений между
+# загрузками вместо нового пула (и рукопожатий) на каждый вызов
+_session: aiohttp.ClientSession | None = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Возвращает общую для процесса aiohttp-сессию, создавая ее лениво."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=DOWNLOAD_CONCURRENCY,
+                limit_per_host=DOWNLOAD_CONCURRENCY,
+                ttl_dns_cache=300,
+            ),
+            headers=SEGMENT_HEADERS,
+            # Сегменты весят мегабайты: крупный буфер чтения уменьшает число
+            # проходов парсера по сравнению с 64KB по умолчанию
+            read_bufsize=1 << 20,
+        )
+    return _session
+
+
+async def close_session() -> None:
+    """Закрывает общую сессию (вызывается при остановке процесса)."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+
+# Общий headless-браузер для fallback-пути: запуск Chromium стоит секунды,
+# поэтому держим один на процесс, а изоляцию дает new_context на вызов
+_playwright = None
+_browser = None
+_browser_lock = asyncio.Lock()
+
+
+async def get_browser():
+    """Возвращает общий Playwright-браузер, запуская его при первом обращении."""
+    global _playwright, _browser
+    async with _browser_lock:
+        if _browser is None or not _browser.is_connected():
+            if _playwright is None:
+                _playwright = await async_playwright().start()
+            _browser = await _playwright.chromium.launch(headless=True)
+        return _browser
+
+
+async def close_browser() -> None:
+    """Останавливает общий браузер и Playwright (при остановке процесса)."""
+    global _playwright, _browser
+    async with _browser_lock:
+        if _browser is not None:
+            await _browser.close()
+            _browser = None
+        if _playwright is not None:
+            await _playwright.stop()
+            _playwright = None
+
+
+# Кэш метаданных по video_id: повторный запрос той же ссылки не платит
+# за API-запрос (и тем более за запуск браузера) заново
+INFO_CACHE_TTL = 600.0
+# Жесткий потолок на размер кэшей: TTL сам по себе не вытесняет записи,
+# к которым больше не обращаются, и долгоживущий процесс копил бы их вечно
+_INFO_CACHE_MAX = 128
+_info_cache: dict[str, tuple[float, dict[str, Any]]] = {}
+_info_locks: dict[str, asyncio.Lock] = {}
+
+
+def _cache_put(cache: dict[str, tuple[float, Any]], key: str, value: tuple[float, Any]) -> None:
+    """Кладет запись в кэш, вытесняя самые старые при превышении лимита."""
+    cache.pop(key, None)
+    cache[key] = value
+    while len(cache) > _INFO_CACHE_MAX:
+        cache.pop(next(iter(cache)))
+
+
+def _info_cache_get(video_id: str) -> dict[str, Any] | None:
+    """Возвращает закэшированную информацию о видео, если она не устарела."""
+    entry = _info_cache.get(video_id)
+    if entry is None:
+        return None
+    cached_at, info = entry
+    if time.monotonic() - cached_at > INFO_CACHE_TTL:
+        _info_cache.pop(video_id, None)
+        return None
+    # Обновляем позицию записи: вытесняется всегда самая давно не нужная
+    _info_cache[video_id] = _info_cache.pop(video_id)
+    return info
+
+
+def invalidate_video_info(video_id: str) -> None:
+    """Сбрасывает кэш для видео (например, после неудачной загрузки)."""
+    _info_cache.pop(video_id, None)
+
+
+# Компилируем один раз при загрузке модуля, а не на каждый вызов
+_VIDEO_ID_RE = re.compile(r'/video/([a-f0-9]+)')
+
+# Таблица для очистки названий: недопустимые для имен файлов символы
+# и пробельные заменяются на '_' одним C-вызовом str.translate
+_BAD_TITLE_TABLE = str.maketrans({c: '_' for c in '<>:"/\\|?* \t\n\r\x0b\x0c'})
+
 
 def extract_video_id(url: str) -> str | None:
     """Извлекает ID видео из URL Rutube."""
-    match = re.search(r'/video/([a-f0-9]+)', url)
+    match = _VIDEO_ID_RE.search(url)
     return match.group(1) if match else None
 
 
-async def get_video_info(page: Page, video_id: str) -> dict[str, Any] | None:
-    """Получает информацию о видео через API Rutube."""
-    api_url = (
+def _options_api_url(video_id: str) -> str:
+    """Строит URL options-API для указанного видео."""
+    return (
         f"https://rutube.ru/api/play/options/{video_id}/"
         "?no_404=true&referer=https%3A%2F%2Frutube.ru&pver=v2&client=wdp&mq=all&av1=1"
     )
-    
+
+
+API_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Referer": "https://rutube.ru/",
+    "Accept": "application/json, text/plain, */*",
+    "Accept-Language": "ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7",
+    "X-Requested-With": "XMLHttpRequest",
+}
+
+
+async def fetch_video_info(video_id: str) -> dict[str, Any] | None:
+    """
+    Получает информацию о видео прямым HTTPS-запросом к API Rutube.
+
+    API не требует выполнения JS, поэтому в типичном случае полный запуск
+    Chromium не нужен: один GET вместо секунд старта браузера.
+    """
+    api_url = _options_api_url(video_id)
+    try:
+        async with get_session().get(
+            api_url,
+            headers=API_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=30),
+        ) as response:
+            logger.info("Статус ответа API: %s для video_id: %s", response.status, video_id)
+            if response.status >= 400:
+                return None
+            data = await response.json(content_type=None)
+            logger.info("Успешно получена информация о видео: %s", data.get('title', 'без названия'))
+            return data
+    except Exception as e:
+        logger.warning("Ошибка при прямом запросе к API: %s", e)
+        return None
+
+
+async def get_video_info(page: Page, video_id: str) -> dict[str, Any] | None:
+    """Получает информацию о видео через API Rutube."""
+    api_url = _options_api_url(video_id)
+
     try:
         # Используем page.request для API запросов с cookies из текущего контекста
         response = await page.request.get(
@@ -40,38 +226,29 @@ async def get_video_info(page: Page, video_id: str) -> dict[str, Any] | None:
         )
         
         status = response.status
-        print(f"Статус ответа API: {status} для video_id: {video_id}")
-        
+        logger.info("Статус ответа API: %s для video_id: %s", status, video_id)
+
+        # Читаем тело один раз: оно нужно и для диагностики, и для парсинга
+        body = await response.body()
+
         if not response.ok:
-            # Пытаемся получить текст ответа для диагностики
-            try:
-                text = await response.text()
-                print(f"Ошибка API (статус {status}): {text[:500]}")
-                if status == 500:
-                    print(f"API вернул ошибку 500. Возможно, видео недоступно или заблокировано.")
-            except Exception:
-                pass
+            logger.warning("Ошибка API (статус %s): %r", status, body[:500])
+            if status == 500:
+                logger.info("API вернул ошибку 500. Возможно, видео недоступно или заблокировано.")
             return None
-        
+
         # Парсим JSON ответ
         try:
-            data = await response.json()
-            print(f"Успешно получена информация о видео: {data.get('title', 'без названия')}")
+            data = orjson.loads(body)
+            logger.info("Успешно получена информация о видео: %s", data.get('title', 'без названия'))
             return data
-        except Exception as json_error:
-            print(f"Ошибка при парсинге JSON ответа: {json_error}")
-            # Пытаемся получить текст ответа
-            try:
-                text = await response.text()
-                print(f"Текст ответа (первые 500 символов): {text[:500]}")
-            except Exception:
-                pass
+        except orjson.JSONDecodeError as json_error:
+            logger.warning("Ошибка при парсинге JSON ответа: %s", json_error)
+            logger.warning("Тело ответа (первые 500 байт): %r", body[:500])
             return None
-            
+
     except Exception as e:
-        print(f"Ошибка при получении информации о видео: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Ошибка при получении информации о видео: %s", e)
     
     return None
 
@@ -101,10 +278,10 @@ async def extract_video_info_from_page(page: Page) -> dict[str, Any] | None:
                 }
             """)
             if page_data:
-                print("Найдены данные в window объекте")
+                logger.info("Найдены данные в window объекте")
                 return page_data
         except Exception as e:
-            print(f"Не удалось извлечь данные из window: {e}")
+            logger.debug("Не удалось извлечь данные из window: %s", e)
         
         # Альтернативный метод: ищем в script тегах с типом application/json
         try:
@@ -126,123 +303,259 @@ async def extract_video_info_from_page(page: Page) -> dict[str, Any] | None:
                 }
             """)
             if script_content:
-                print("Найдены данные в script тегах")
+                logger.info("Найдены данные в script тегах")
                 return script_content
         except Exception as e:
-            print(f"Не удалось извлечь данные из script тегов: {e}")
+            logger.debug("Не удалось извлечь данные из script тегов: %s", e)
             
     except Exception as e:
-        print(f"Ошибка при извлечении данных со страницы: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Ошибка при извлечении данных со страницы: %s", e)
     
     return None
 
 
+# Возможные пути до M3U8-ссылки в порядке приоритета: стандартный ответ API,
+# данные, извлеченные со страницы, и Next.js-структура props.pageProps
+_M3U8_PATHS = (
+    ("video_balancer", "m3u8"),
+    ("video_balancer", "default"),
+    ("video", "video_balancer", "m3u8"),
+    ("video", "video_balancer", "default"),
+    ("props", "pageProps", "video", "video_balancer", "m3u8"),
+    ("props", "pageProps", "video", "video_balancer", "default"),
+)
+
+
 def get_m3u8_url(video_info: dict[str, Any]) -> str | None:
     """Извлекает URL M3U8 плейлиста из информации о видео."""
-    # Стандартный формат API Rutube
-    if "video_balancer" in video_info:
-        balancer = video_info["video_balancer"]
-        if isinstance(balancer, dict):
-            if "m3u8" in balancer:
-                return balancer["m3u8"]
-            if "default" in balancer:
-                return balancer["default"]
-    
-    # Альтернативные пути для данных, извлеченных со страницы
-    if "video" in video_info:
-        video = video_info["video"]
-        if isinstance(video, dict):
-            if "video_balancer" in video:
-                balancer = video["video_balancer"]
-                if isinstance(balancer, dict):
-                    if "m3u8" in balancer:
-                        return balancer["m3u8"]
-                    if "default" in balancer:
-                        return balancer["default"]
-    
-    # Проверка в props.pageProps (Next.js структура)
-    if "props" in video_info:
-        props = video_info["props"]
-        if isinstance(props, dict) and "pageProps" in props:
-            page_props = props["pageProps"]
-            if isinstance(page_props, dict) and "video" in page_props:
-                video = page_props["video"]
-                if isinstance(video, dict) and "video_balancer" in video:
-                    balancer = video["video_balancer"]
-                    if isinstance(balancer, dict):
-                        if "m3u8" in balancer:
-                            return balancer["m3u8"]
-                        if "default" in balancer:
-                            return balancer["default"]
-    
+    for path in _M3U8_PATHS:
+        current: Any = video_info
+        for key in path:
+            current = current.get(key) if isinstance(current, dict) else None
+            if current is None:
+                break
+        if isinstance(current, str):
+            return current
     return None
 
 
-def parse_m3u8_playlist(m3u8_url: str) -> list[str]:
+# Кэш разобранных плейлистов: повторная загрузка того же видео в пределах
+# TTL пропускает оба HTTP-запроса (master + variant) и парсинг
+_playlist_cache: dict[str, tuple[float, list[str]]] = {}
+
+
+def _invalidate_playlist(m3u8_url: str) -> None:
+    """Сбрасывает кэш плейлиста (ссылки на сегменты могли протухнуть)."""
+    _playlist_cache.pop(m3u8_url, None)
+
+
+async def _fetch_playlist(m3u8_url: str) -> m3u8.M3U8:
+    """Скачивает плейлист через общую сессию и парсит его из текста."""
+    async with get_session().get(
+        m3u8_url, timeout=aiohttp.ClientTimeout(total=30)
+    ) as response:
+        response.raise_for_status()
+        text = await response.text()
+    return m3u8.loads(text, uri=m3u8_url)
+
+
+async def parse_m3u8_playlist(m3u8_url: str) -> list[str]:
     """Парсит M3U8 плейлист и возвращает список URL сегментов."""
-    playlist = m3u8.load(m3u8_url)
-    segments: list[str] = []
-    
+    entry = _playlist_cache.get(m3u8_url)
+    if entry is not None and time.monotonic() - entry[0] <= INFO_CACHE_TTL:
+        _playlist_cache[m3u8_url] = _playlist_cache.pop(m3u8_url)
+        return entry[1]
+
+    requested_url = m3u8_url
+    playlist = await _fetch_playlist(m3u8_url)
+
     # Если это master playlist, выбираем самый высокий битрейт
     if playlist.is_variant:
         best_playlist = max(
             playlist.playlists,
             key=lambda p: p.stream_info.bandwidth if p.stream_info else 0
         )
-        variant_url = urljoin(m3u8_url, best_playlist.uri)
-        playlist = m3u8.load(variant_url)
-        # Обновляем базовый URL для сегментов после загрузки варианта
-        m3u8_url = variant_url
-    
-    # Получаем базовый URL правильно используя urlparse
-    parsed = urlparse(m3u8_url)
-    # Строим базовый URL: scheme + netloc + путь до файла (без имени файла)
-    path_parts = parsed.path.rstrip('/').split('/')
-    base_path = '/'.join(path_parts[:-1]) if len(path_parts) > 1 else ''
-    base_url = f"{parsed.scheme}://{parsed.netloc}{base_path}/"
-    
-    for segment in playlist.segments:
-        # urljoin правильно обрабатывает относительные и абсолютные URL
-        segment_url = urljoin(base_url, segment.uri)
-        segments.append(segment_url)
-    
+        m3u8_url = urljoin(m3u8_url, best_playlist.uri)
+        playlist = await _fetch_playlist(m3u8_url)
+
+    # Базовый URL — путь плейлиста без имени файла; urljoin с '.' делает
+    # это за один вызов
+    base_url = urljoin(m3u8_url, '.')
+
+    # urljoin правильно обрабатывает относительные и абсолютные URL
+    segments = [urljoin(base_url, segment.uri) for segment in playlist.segments]
+    _cache_put(_playlist_cache, requested_url, (time.monotonic(), segments))
     return segments
 
 
-def download_segment(url: str, output_path: Path, session: requests.Session) -> bool:
-    """Скачивает один сегмент видео."""
+async def _probe_range_support(session: aiohttp.ClientSession, url: str) -> int:
+    """
+    Проверяет одним HEAD-запросом, имеет ли смысл Range-деление сегментов.
+
+    Сегменты одного плейлиста однородны по размеру, поэтому проба первого
+    сегмента отвечает за весь плейлист: типичные HLS-сегменты мельче порога,
+    и без этой пробы каждый сегмент платил бы за HEAD перед своим GET.
+
+    Возвращает размер первого сегмента, если деление имеет смысл, иначе 0.
+    """
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-            "Referer": "https://rutube.ru/",
-        }
-        response = session.get(url, headers=headers, stream=True, timeout=30)
-        response.raise_for_status()
-        
-        with open(output_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        return True
+        async with session.head(
+            url, timeout=aiohttp.ClientTimeout(total=10)
+        ) as head:
+            if head.status >= 400:
+                return 0
+            if head.headers.get("Accept-Ranges") != "bytes":
+                return 0
+            length = int(head.headers.get("Content-Length", "0"))
+            return length if length >= RANGE_SPLIT_THRESHOLD else 0
+    except Exception:
+        return 0
+
+
+async def _download_segment_ranged(
+    session: aiohttp.ClientSession, url: str, parts: int, length_hint: int
+) -> bytes | None:
+    """
+    Скачивает крупный сегмент несколькими параллельными Range-запросами.
+
+    Размер сегмента не запрашивается отдельным HEAD'ом: размер части
+    оценивается по length_hint из пробы плейлиста, а точный размер берется
+    из Content-Range ответа на первую часть. Возвращает None, если сервер
+    перестал отдавать Range или любая часть не удалась — в этом случае
+    вызывающий код делает обычный GET.
+    """
+    try:
+        chunk = -(-length_hint // parts)  # ceil
+
+        async def get_part(start: int, end: int) -> bytes:
+            async with session.get(
+                url,
+                headers={"Range": f"bytes={start}-{end}"},
+                timeout=aiohttp.ClientTimeout(total=30),
+            ) as response:
+                if response.status != 206:
+                    raise ValueError(f"Range не поддержан: {response.status}")
+                return await response.read()
+
+        # Первая часть сразу GET'ом: из Content-Range узнаем точный размер
+        async with session.get(
+            url,
+            headers={"Range": f"bytes=0-{chunk - 1}"},
+            timeout=aiohttp.ClientTimeout(total=30),
+        ) as response:
+            if response.status == 200:
+                # Сервер проигнорировал Range и отдал сегмент целиком
+                return await response.read()
+            if response.status != 206:
+                return None
+            total_field = response.headers.get("Content-Range", "").rpartition("/")[2]
+            if not total_field.isdigit():
+                return None
+            length = int(total_field)
+            first = await response.read()
+
+        if length <= chunk:
+            return first
+
+        pieces = await asyncio.gather(*[
+            get_part(start, min(start + chunk, length) - 1)
+            for start in range(chunk, length, chunk)
+        ])
+        return first + b"".join(pieces)
+    except Exception:
+        return None
+
+
+class _AdaptiveLimiter:
+    """
+    AIMD-контроллер параллелизма сегментов.
+
+    Начинает с небольшого числа одновременных запросов, аддитивно наращивает
+    его по мере успешных скачиваний и мультипликативно сбрасывает при
+    троттлинге источника (429/5xx), чтобы не провоцировать каскад отказов.
+    Слоты, как и раньше, возвращает writer — лимит одновременно ограничивает
+    и сеть, и число сегментов в памяти.
+    """
+
+    # Прибавляем слот после стольких успешных сегментов подряд
+    GROW_EVERY = 8
+
+    def __init__(self, start: int = 4, maximum: int = DOWNLOAD_CONCURRENCY) -> None:
+        self._sem = asyncio.Semaphore(start)
+        self._limit = start
+        self._maximum = maximum
+        self._debt = 0  # сколько возвратов слотов нужно "проглотить" после сжатия
+        self._successes = 0
+
+    async def acquire(self) -> None:
+        await self._sem.acquire()
+
+    def release(self) -> None:
+        if self._debt > 0:
+            self._debt -= 1
+        else:
+            self._sem.release()
+
+    def on_success(self) -> None:
+        self._successes += 1
+        if self._successes % self.GROW_EVERY == 0 and self._limit < self._maximum:
+            self._limit += 1
+            self._sem.release()
+
+    def on_throttle(self) -> None:
+        new_limit = max(2, self._limit // 2)
+        self._debt += self._limit - new_limit
+        self._limit = new_limit
+        self._successes = 0
+
+
+async def download_segment(
+    session: aiohttp.ClientSession,
+    url: str,
+    range_split: int = 0,
+    limiter: _AdaptiveLimiter | None = None,
+    length_hint: int = 0,
+) -> bytes | None:
+    """Скачивает один сегмент видео и возвращает его содержимое."""
+    try:
+        if range_split > 1 and length_hint:
+            data = await _download_segment_ranged(session, url, range_split, length_hint)
+            if data is not None:
+                if limiter is not None:
+                    limiter.on_success()
+                return data
+
+        async with session.get(
+            url, timeout=aiohttp.ClientTimeout(total=30)
+        ) as response:
+            if limiter is not None and (
+                response.status == 429 or response.status >= 500
+            ):
+                limiter.on_throttle()
+            response.raise_for_status()
+            data = await response.read()
+            if limiter is not None:
+                limiter.on_success()
+            return data
     except Exception as e:
-        print(f"Ошибка при скачивании сегмента {url}: {e}")
-        return False
+        logger.warning("Ошибка при скачивании сегмента %s: %s", url, e)
+        return None
 
 
 async def download_video(
-    m3u8_url: str, 
-    output_path: Path, 
-    status_callback: Callable[[dict[str, Any]], Awaitable[None]] | None = None
+    m3u8_url: str,
+    output_path: Path,
+    status_callback: Callable[[dict[str, Any]], Awaitable[None]] | None = None,
+    range_split: int = 0,
 ) -> bool:
     """
     Скачивает видео из M3U8 плейлиста.
-    
+
     Args:
         m3u8_url: URL M3U8 плейлиста
         output_path: Путь для сохранения видео
         status_callback: Асинхронный callback для отправки статуса
+        range_split: Делить крупные сегменты на N параллельных Range-запросов
     """
     async def send_status(status: str, progress: float | None = None, message: str | None = None) -> None:
         """Вспомогательная функция для отправки статуса."""
@@ -253,104 +566,135 @@ async def download_video(
                 "message": message
             })
     
-    print(f"Парсинг M3U8 плейлиста: {m3u8_url}")
+    logger.info("Парсинг M3U8 плейлиста: %s", m3u8_url)
     await send_status("parsing", 0, "Парсинг M3U8 плейлиста...")
     
     try:
-        segments = parse_m3u8_playlist(m3u8_url)
-        print(f"Найдено сегментов: {len(segments)}")
+        segments = await parse_m3u8_playlist(m3u8_url)
+        logger.info("Найдено сегментов: %s", len(segments))
         await send_status("parsing", 10, f"Найдено сегментов: {len(segments)}")
     except Exception as e:
-        print(f"Ошибка при парсинге M3U8: {e}")
+        logger.error("Ошибка при парсинге M3U8: %s", e)
         await send_status("error", None, f"Ошибка при парсинге M3U8: {e}")
         return False
     
     if not segments:
-        print("Сегменты не найдены")
+        logger.error("Сегменты не найдены")
         await send_status("error", None, "Сегменты не найдены")
         return False
     
-    # Создаем временную директорию для сегментов
-    temp_dir = output_path.parent / f"{output_path.stem}_segments"
-    temp_dir.mkdir(exist_ok=True)
-    
-    session = requests.Session()
-    
-    # Скачиваем все сегменты
-    print("Скачивание сегментов...")
+    # Скачиваем сегменты параллельно и пишем их сразу в выходной файл
+    # в порядке плейлиста: MPEG-TS безопасно конкатенируется, поэтому
+    # промежуточные segment-файлы и отдельный merge-проход не нужны
+    logger.info("Скачивание сегментов...")
     await send_status("downloading", 20, "Начало скачивания сегментов...")
-    downloaded_segments: list[Path] = []
-    
-    with tqdm(total=len(segments), desc="Скачивание", unit="сегмент") as pbar:
-        for i, segment_url in enumerate(segments, 1):
-            segment_path = temp_dir / f"segment_{i:05d}.ts"
-            
-            if segment_path.exists():
-                downloaded_segments.append(segment_path)
-                pbar.update(1)
-            else:
-                # Выполняем синхронное скачивание в отдельном потоке
-                success = await asyncio.to_thread(download_segment, segment_url, segment_path, session)
-                if success:
-                    downloaded_segments.append(segment_path)
+
+    total = len(segments)
+    # Адаптивный лимит ограничивает и параллелизм сети, и число сегментов
+    # в памяти: слот освобождает writer после записи сегмента на диск
+    limiter = _AdaptiveLimiter()
+    session = get_session()
+
+    # Range-деление включаем только если источник его поддерживает и сегменты
+    # достаточно крупные — одна проба на плейлист, а не HEAD на каждый сегмент;
+    # размер из пробы служит оценкой размера части для остальных сегментов
+    length_hint = 0
+    if range_split > 1:
+        length_hint = await _probe_range_support(session, segments[0])
+        if not length_hint:
+            range_split = 0
+
+    results: dict[int, bytes | None] = {}
+    arrived = asyncio.Condition()
+    tasks: list[asyncio.Task[None]] = []
+
+    try:
+        async def fetch(index: int, segment_url: str) -> None:
+            """Скачивает один сегмент в память; слот вернет writer."""
+            await limiter.acquire()
+            data = await download_segment(
+                session, segment_url, range_split, limiter, length_hint
+            )
+            async with arrived:
+                results[index] = data
+                arrived.notify_all()
+
+        tasks = [
+            asyncio.create_task(fetch(i, segment_url))
+            for i, segment_url in enumerate(segments, 1)
+        ]
+
+        written = 0
+        last_pct = -1
+        with open(output_path, "wb") as outfile, _progress_bar(total) as pbar:
+            for index in range(1, total + 1):
+                async with arrived:
+                    await arrived.wait_for(lambda: index in results)
+                    data = results.pop(index)
+                # Сегмент потреблен — освобождаем слот следующему fetch'у
+                limiter.release()
+
+                if data is None:
+                    logger.warning("Не удалось скачать сегмент %s, продолжаем...", index)
                 else:
-                    print(f"\nНе удалось скачать сегмент {i}, продолжаем...")
+                    await asyncio.to_thread(outfile.write, data)
+                    written += 1
+
                 pbar.update(1)
-            
-            # Отправляем прогресс скачивания (20-80%)
-            progress = 20 + (i / len(segments)) * 60
-            await send_status("downloading", progress, f"Скачано сегментов: {i}/{len(segments)}")
-    
-    if not downloaded_segments:
-        print("Не удалось скачать ни одного сегмента")
-        await send_status("error", None, "Не удалось скачать ни одного сегмента")
-        return False
-    
-    # Объединяем сегменты
-    print(f"Объединение {len(downloaded_segments)} сегментов в файл {output_path}...")
-    await send_status("merging", 80, "Объединение сегментов...")
-    try:
-        async def merge_segments_async() -> None:
-            """Асинхронная функция для объединения сегментов с отправкой статуса."""
-            with open(output_path, "wb") as outfile:
-                for idx, segment_path in enumerate(downloaded_segments, 1):
-                    with open(segment_path, "rb") as infile:
-                        outfile.write(infile.read())
-                    
-                    # Отправляем прогресс объединения (80-95%)
-                    progress = 80 + (idx / len(downloaded_segments)) * 15
-                    await send_status("merging", progress, f"Объединение: {idx}/{len(downloaded_segments)}")
-        
-        # Выполняем объединение
-        await merge_segments_async()
-        
-        # Удаляем временную директорию
-        import shutil
-        await asyncio.to_thread(shutil.rmtree, temp_dir)
-        
-        print(f"Видео успешно скачано: {output_path}")
-        # НЕ отправляем сообщение "completed" здесь, так как финальное сообщение
-        # с правильным именем файла будет отправлено из routes/video.py после переименования
-        # await send_status("completed", 100, f"Видео успешно скачано: {output_path.name}")
-        return True
+
+                # Прогресс скачивания (20-95%), не чаще одного раза на процент:
+                # на длинных плейлистах это сотни await вместо тысяч
+                pct = int(20 + (index / total) * 75)
+                if pct != last_pct:
+                    last_pct = pct
+                    await send_status(
+                        "downloading",
+                        pct,
+                        f"Скачано сегментов: {index}/{total}",
+                    )
+
+        await asyncio.gather(*tasks)
     except Exception as e:
-        print(f"Ошибка при объединении сегментов: {e}")
-        await send_status("error", None, f"Ошибка при объединении сегментов: {e}")
+        logger.error("Ошибка при скачивании сегментов: %s", e)
+        await send_status("error", None, f"Ошибка при скачивании сегментов: {e}")
+        output_path.unlink(missing_ok=True)
+        _invalidate_playlist(m3u8_url)
+        return False
+    finally:
+        # Ошибка writer'а (например, исключение из status_callback) не должна
+        # оставлять fetch-таски висеть на limiter.acquire(): отменяем их и
+        # дожидаемся завершения, чтобы таски не утекали между загрузками
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    if not written:
+        logger.error("Не удалось скачать ни одного сегмента")
+        await send_status("error", None, "Не удалось скачать ни одного сегмента")
+        output_path.unlink(missing_ok=True)
+        _invalidate_playlist(m3u8_url)
         return False
 
+    logger.info("Видео успешно скачано: %s", output_path)
+    # НЕ отправляем сообщение "completed" здесь, так как финальное сообщение
+    # с правильным именем файла будет отправлено из routes/video.py после переименования
+    return True
+
 
 async def download_rutube_video(
-    url: str, 
+    url: str,
     output_path: str | None = None,
-    status_callback: Callable[[dict[str, Any]], Awaitable[None]] | None = None
+    status_callback: Callable[[dict[str, Any]], Awaitable[None]] | None = None,
+    range_split: int = 0,
 ) -> bool:
     """
     Основная функция для скачивания видео с Rutube.
-    
+
     Args:
         url: URL видео с Rutube
         output_path: Путь для сохранения видео
         status_callback: Асинхронный callback для отправки статуса
+        range_split: Делить крупные сегменты на N параллельных Range-запросов
     """
     async def send_status(status: str, progress: float | None = None, message: str | None = None) -> None:
         """Вспомогательная функция для отправки статуса."""
@@ -364,99 +708,178 @@ async def download_rutube_video(
     video_id = extract_video_id(url)
     if not video_id:
         error_msg = f"Не удалось извлечь ID видео из URL: {url}"
-        print(error_msg)
+        logger.error(error_msg)
         await send_status("error", None, error_msg)
         return False
     
-    print(f"ID видео: {video_id}")
+    logger.info("ID видео: %s", video_id)
     await send_status("initializing", 0, f"Инициализация загрузки видео (ID: {video_id})...")
-    
-    # Используем Playwright для получения информации о видео
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            viewport={"width": 1920, "height": 1080},
-            locale="ru-RU"
+
+    logger.info("Получение информации о видео через API...")
+    await send_status("fetching_info", 5, "Получение информации о видео...")
+    video_info = await _resolve_video_info(url, video_id, send_status)
+
+    if not video_info:
+        error_msg = (
+            f"Не удалось получить информацию о видео (ID: {video_id}). "
+            "Возможные причины: видео недоступно, заблокировано или удалено. "
+            "Проверьте, что видео доступно для просмотра на rutube.ru"
         )
-        page = await context.new_page()
-        
-        try:
-            # Сначала открываем страницу видео, чтобы получить cookies и контекст
-            print(f"Открываем страницу видео: {url}")
-            await send_status("fetching_info", 3, "Загрузка страницы видео...")
-            try:
-                await page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                # Ждем немного, чтобы страница полностью загрузилась
-                await page.wait_for_timeout(2000)
-            except Exception as page_error:
-                print(f"Предупреждение при загрузке страницы видео: {page_error}")
-                # Продолжаем, даже если страница не загрузилась полностью
-            
-            print("Получение информации о видео через API...")
-            await send_status("fetching_info", 5, "Получение информации о видео...")
-            video_info = await get_video_info(page, video_id)
-            
-            # Если API не сработал, пытаемся извлечь данные со страницы
+        logger.error(error_msg)
+        await send_status("error", None, error_msg)
+        return False
+
+    # Определяем путь для сохранения на основе названия видео
+    video_title = video_info.get("title", f"video_{video_id}")
+    # Заменяем пробелы на подчеркивания и очищаем от недопустимых символов
+    safe_title = video_title.translate(_BAD_TITLE_TABLE)
+
+    if output_path:
+        output_path = Path(output_path)
+        # Если указана директория или путь без расширения, добавляем название файла
+        if output_path.suffix == '' or (output_path.exists() and output_path.is_dir()):
+            output_path = output_path / f"{safe_title}.mp4"
+        # Если указан полный путь с расширением, используем его как есть
+    else:
+        # Используем название видео для имени файла
+        output_path = Path(f"{safe_title}.mp4")
+
+    await send_status("fetching_info", 10, f"Видео: {video_title}")
+
+    m3u8_url = get_m3u8_url(video_info)
+    if not m3u8_url:
+        error_msg = "M3U8 URL не найден в информации о видео"
+        logger.error(error_msg)
+        await send_status("error", None, error_msg)
+        return False
+
+    logger.info("M3U8 URL: %s", m3u8_url)
+
+    # Скачиваем видео
+    success = await download_video(m3u8_url, output_path, status_callback, range_split)
+    if not success:
+        # M3U8-ссылки могли протухнуть — повторная попытка должна
+        # перезапросить метаданные, а не переиспользовать кэш
+        invalidate_video_info(video_id)
+    return success
+
+
+async def _resolve_video_info(
+    url: str,
+    video_id: str,
+    send_status: Callable[..., Awaitable[None]],
+) -> dict[str, Any] | None:
+    """
+    Возвращает информацию о видео из кэша или запрашивает ее.
+
+    Per-key лок предотвращает thundering herd: параллельные запросы одного
+    видео делают один сетевой запрос (и максимум один запуск браузера).
+    """
+    video_info = _info_cache_get(video_id)
+    if video_info is not None:
+        logger.info("Информация о видео взята из кэша (ID: %s)", video_id)
+        return video_info
+
+    lock = _info_locks.setdefault(video_id, asyncio.Lock())
+    try:
+        async with lock:
+            # Пока ждали лок, сосед мог уже заполнить кэш
+            video_info = _info_cache_get(video_id)
+            if video_info is not None:
+                return video_info
+
+            # Обычный случай: API отвечает на прямой HTTPS-запрос, браузер не нужен
+            video_info = await fetch_video_info(video_id)
+
+            # Fallback: полный браузерный путь (cookies страницы, данные из HTML)
             if not video_info:
-                print("API не вернул данные, пытаемся извлечь информацию со страницы...")
+                logger.info("Прямой запрос к API не удался, используем браузер...")
                 await send_status("fetching_info", 7, "Попытка альтернативного метода получения информации...")
-                video_info = await extract_video_info_from_page(page)
-            
-            if not video_info:
-                error_msg = (
-                    f"Не удалось получить информацию о видео (ID: {video_id}). "
-                    "Возможные причины: видео недоступно, заблокировано или удалено. "
-                    "Проверьте, что видео доступно для просмотра на rutube.ru"
-                )
-                print(error_msg)
-                await send_status("error", None, error_msg)
-                return False
-            
-            # Определяем путь для сохранения на основе названия видео
-            video_title = video_info.get("title", f"video_{video_id}")
-            # Заменяем пробелы на подчеркивания и очищаем от недопустимых символов
-            safe_title = re.sub(r'[<>:"/\\|?*\s]', '_', video_title)
-            
-            if output_path:
-                output_path = Path(output_path)
-                # Если указана директория или путь без расширения, добавляем название файла
-                if output_path.suffix == '' or (output_path.exists() and output_path.is_dir()):
-                    output_path = output_path / f"{safe_title}.mp4"
-                # Если указан полный путь с расширением, используем его как есть
-            else:
-                # Используем название видео для имени файла
-                output_path = Path(f"{safe_title}.mp4")
-            
-            await send_status("fetching_info", 10, f"Видео: {video_title}")
-            
-            m3u8_url = get_m3u8_url(video_info)
-            if not m3u8_url:
-                error_msg = "M3U8 URL не найден в информации о видео"
-                print(error_msg)
-                await send_status("error", None, error_msg)
-                return False
-            
-            print(f"M3U8 URL: {m3u8_url}")
-            
-        finally:
-            await browser.close()
-        
-        # Скачиваем видео
-        return await download_video(m3u8_url, output_path, status_callback)
+                video_info = await _fetch_video_info_with_browser(url, video_id)
+
+            if video_info:
+                _cache_put(_info_cache, video_id, (time.monotonic(), video_info))
+            return video_info
+    finally:
+        # Лок нужен только на время заполнения кэша; снимаем его и при
+        # неудаче — иначе каждый несуществующий video_id оставлял бы свой
+        # Lock в словаре навсегда. Ждущие корутины держат свою ссылку.
+        _info_locks.pop(video_id, None)
+
+
+async def _fetch_video_info_with_browser(url: str, video_id: str) -> dict[str, Any] | None:
+    """
+    Запасной путь получения информации о видео через Playwright.
+
+    Используется, когда прямой запрос к API не прошел (например, из-за
+    антибот-проверки): открывает страницу для получения cookies и повторяет
+    запрос из контекста браузера, либо извлекает данные из HTML.
+    """
+    browser = await get_browser()
+    context = await browser.new_context(
+        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        locale="ru-RU"
+    )
+    page = await context.new_page()
+
+    try:
+        # Сначала открываем страницу видео, чтобы получить cookies и контекст
+        logger.info("Открываем страницу видео: %s", url)
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            # Ждем появления cookies вместо фиксированной паузы: обычно они
+            # выставляются почти сразу после domcontentloaded
+            await page.wait_for_function(
+                "document.cookie.length > 0", timeout=2000
+            )
+        except Exception as page_error:
+            logger.warning("Предупреждение при загрузке страницы видео: %s", page_error)
+            # Продолжаем, даже если страница не загрузилась полностью
+
+        video_info = await get_video_info(page, video_id)
+
+        # Если API не сработал, пытаемся извлечь данные со страницы
+        if not video_info:
+            logger.info("API не вернул данные, пытаемся извлечь информацию со страницы...")
+            video_info = await extract_video_info_from_page(page)
+
+        return video_info
+    finally:
+        # Закрываем только контекст: браузер общий и переживает вызов
+        await context.close()
 
 
 async def main() -> None:
     """Точка входа в программу."""
-    if len(sys.argv) < 2:
-        print("Использование: python rutube_downloader.py <URL> [output_path]")
+    # При запуске из консоли выводим ход загрузки как раньше
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    args = sys.argv[1:]
+
+    # Опциональный флаг --range-split=N: делить крупные сегменты
+    # на N параллельных Range-запросов
+    range_split = 0
+    for arg in list(args):
+        if arg.startswith("--range-split="):
+            try:
+                range_split = int(arg.split("=", 1)[1])
+            except ValueError:
+                print(f"Неверное значение флага: {arg}")
+                sys.exit(1)
+            args.remove(arg)
+
+    if not args:
+        print("Использование: python rutube_downloader.py <URL> [output_path] [--range-split=N]")
         print("Пример: python rutube_downloader.py https://rutube.ru/video/55f0ce41c0a5adc5b5b263fdf9baa187/")
         sys.exit(1)
-    
-    url = sys.argv[1]
-    output_path = sys.argv[2] if len(sys.argv) > 2 else None
-    
-    success = await download_rutube_video(url, output_path)
+
+    url = args[0]
+    output_path = args[1] if len(args) > 1 else None
+
+    try:
+        success = await download_rutube_video(url, output_path, range_split=range_split)
+    finally:
+        await close_session()
+        await close_browser()
     sys.exit(0 if success else 1)
 
 
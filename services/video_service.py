@@ -1,18 +1,36 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
 import re
-import tempfile
-from collections.abc import Iterator
 from pathlib import Path
-from typing import Any, Callable, Awaitable
+from typing import Any, Callable, Awaitable, ClassVar
 
+import config
 from rutube_downloader import download_rutube_video
 
+logger = logging.getLogger(__name__)
+
+# Недопустимые для имен файлов символы удаляются C-таблицей str.translate,
+# без регулярного выражения на каждый вызов
+_BAD_FILENAME_TABLE = str.maketrans('', '', '<>:"/\\|?*')
+
+# Проверка URL привязана к началу строки (ссылки вида
+# https://evil.com/rutube.ru/... не проходят) и допускает поддомены
+# rutube.ru — тот же шаблон, что и в валидации на уровне роутов
+_RUTUBE_URL_RE = re.compile(r"^https?://(?:[a-z0-9-]+\.)?rutube\.ru/", re.IGNORECASE)
+
+# Ограничиваем число одновременных загрузок: всплеск запросов не должен
+# исчерпать дескрипторы и соединения (внутри каждой загрузки свой параллелизм)
+_DOWNLOAD_SEMAPHORE = asyncio.Semaphore(
+    int(os.getenv("MAX_CONCURRENT_DOWNLOADS", "6"))
+)
+
 
 class VideoService:
     """Сервис для работы с видео."""
-    
+
     @staticmethod
     def _sanitize_filename(filename: str) -> str:
         """
@@ -31,7 +49,7 @@ class VideoService:
         
         # Удаляем недопустимые символы для имен файлов
         # Разрешаем: буквы, цифры, пробелы, дефисы, подчеркивания, точки
-        name = re.sub(r'[<>:"/\\|?*]', '', name)
+        name = name.translate(_BAD_FILENAME_TABLE)
         
         # Удаляем ведущие и завершающие пробелы и точки
         name = name.strip('. ')
@@ -67,35 +85,13 @@ class VideoService:
             ValueError: Если URL неверный или видео не удалось скачать
         """
         # Валидация URL
-        if not url or "rutube.ru" not in url:
+        if not url or not _RUTUBE_URL_RE.match(url):
             raise ValueError("Неверный URL. Ожидается URL с rutube.ru")
         
-        # Получаем путь для сохранения из переменной окружения
-        download_path = os.getenv("DOWNLOAD_PATH")
-        download_dir = None
-        
-        if download_path:
-            download_dir = Path(download_path)
-            try:
-                # Создаем директорию, если она не существует
-                download_dir.mkdir(parents=True, exist_ok=True)
-                # Проверяем, что директория доступна для записи
-                test_file = download_dir / ".write_test"
-                try:
-                    test_file.touch()
-                    test_file.unlink()
-                except (OSError, PermissionError):
-                    # Директория недоступна для записи, используем /tmp
-                    download_dir = None
-            except (OSError, PermissionError):
-                # Не удалось создать директорию, используем /tmp
-                download_dir = None
-        
-        if download_dir is None:
-            # Используем /tmp как fallback, если DOWNLOAD_PATH не задан или недоступен
-            download_dir = Path("/tmp")
-            download_dir.mkdir(parents=True, exist_ok=True)
-        
+        # Единая директория загрузки из конфигурации: сервис пишет туда же,
+        # откуда роуты отдают файлы
+        download_dir = config.CONFIG.download_dir
+
         # Обрабатываем имя файла
         # Всегда переименовываем файл, даже если имя не указано (используем дефолтное)
         final_filename = None
@@ -112,112 +108,67 @@ class VideoService:
             final_filename = "video.mp4"
         
         # Логируем для отладки
-        print(f"DEBUG: file_name (input) = {file_name}")
-        print(f"DEBUG: final_filename = {final_filename}")
-        
-        # Создаем временный файл для сохранения видео
-        with tempfile.NamedTemporaryFile(
-            delete=False, suffix=".mp4", dir=download_dir
-        ) as tmp_file:
-            temp_path = Path(tmp_file.name)
-        
-        # Скачиваем видео
-        success = await download_rutube_video(url, str(temp_path), status_callback)
-        
+        logger.debug("file_name (input) = %s", file_name)
+        logger.debug("final_filename = %s", final_filename)
+
+        # Сразу резервируем финальное имя (с номером при коллизии) —
+        # загрузчик пишет прямо в него, и rename после скачивания не нужен
+        final_path = VideoService._create_exclusive(download_dir, final_filename)
+
+        # Скачиваем видео; крупные сегменты делим на параллельные
+        # Range-запросы (мелкие отсекаются порогом в загрузчике)
+        try:
+            async with _DOWNLOAD_SEMAPHORE:
+                success = await download_rutube_video(
+                    url, str(final_path), status_callback, range_split=4
+                )
+        except BaseException:
+            # Исключение (или отмена) загрузчика не должно оставлять
+            # зарезервированный файл: имя было бы занято навсегда, а
+            # TTL-удаление для него никто не назначает
+            final_path.unlink(missing_ok=True)
+            raise
+
         if not success:
-            # Удаляем временный файл при ошибке
-            if temp_path.exists():
-                temp_path.unlink()
+            # Удаляем файл при ошибке
+            final_path.unlink(missing_ok=True)
             raise ValueError("Не удалось скачать видео")
-        
-        # Проверяем, что файл существует и не пустой
-        if not temp_path.exists() or temp_path.stat().st_size == 0:
-            if temp_path.exists():
-                temp_path.unlink()
+
+        # Проверяем, что файл существует и не пустой — одним stat'ом
+        try:
+            size = os.stat(final_path).st_size
+        except FileNotFoundError:
+            size = -1
+        if size <= 0:
+            final_path.unlink(missing_ok=True)
             raise ValueError("Видеофайл не был создан или пуст")
-        
-        # Всегда переименовываем файл из временного в финальное имя
-        # final_filename всегда должен быть установлен (либо из file_name, либо "video.mp4")
-        if final_filename:
-            final_path = download_dir / final_filename
-            # Если файл с таким именем уже существует, добавляем номер
-            counter = 1
-            original_final_path = final_path
-            while final_path.exists():
-                name_without_ext = original_final_path.stem
-                final_path = download_dir / f"{name_without_ext}_{counter}.mp4"
-                counter += 1
-            
-            try:
-                # Пытаемся переименовать файл
-                temp_path.rename(final_path)
-                # Убеждаемся, что возвращаем правильный путь с правильным именем
-                print(f"Файл успешно переименован: {temp_path.name} -> {final_path.name}")
-                return final_path
-            except (OSError, PermissionError) as e:
-                # Если не удалось переименовать, пытаемся скопировать файл
-                # Это может помочь, если файл занят или есть проблемы с правами
-                try:
-                    import shutil
-                    shutil.copy2(temp_path, final_path)
-                    # Удаляем временный файл после успешного копирования
-                    try:
-                        temp_path.unlink()
-                    except Exception:
-                        pass
-                    return final_path
-                except Exception as copy_error:
-                    # Если и копирование не удалось, пытаемся использовать правильное имя
-                    # путем создания жесткой ссылки или просто возвращаем путь с правильным именем
-                    # Но файл физически останется с временным именем
-                    print(f"Ошибка: не удалось переименовать или скопировать файл '{temp_path}' в '{final_path}': {e}, {copy_error}")
-                    # Возвращаем путь с правильным именем, даже если файл физически не переименован
-                    # Это позволит использовать правильное имя в ответе
-                    # Но файл нужно будет искать по временному имени
-                    # Лучше вернуть путь с правильным именем и попытаться создать ссылку
-                    try:
-                        import shutil
-                        # Пытаемся создать жесткую ссылку с правильным именем
-                        final_path.unlink(missing_ok=True)  # Удаляем, если существует
-                        os.link(temp_path, final_path)
-                        return final_path
-                    except Exception:
-                        # Если ничего не помогло, возвращаем временный файл
-                        # Но логируем предупреждение
-                        print(f"Критическая ошибка: файл останется с временным именем '{temp_path.name}' вместо '{final_filename}'")
-                        return temp_path
-        else:
-            # Это не должно происходить, так как final_filename всегда должен быть установлен
-            print(f"Предупреждение: final_filename не установлен, файл останется с временным именем '{temp_path.name}'")
-            return temp_path
-    
-    @staticmethod
-    def create_stream_generator(video_path: Path) -> Iterator[bytes]:
+
+        return final_path
+
+    # Последний использованный номер суффикса по базовому имени: при массовых
+    # коллизиях (сотни foo_N.mp4) не перебираем занятые номера заново
+    _collision_counters: ClassVar[dict[str, int]] = {}
+
+    @classmethod
+    def _create_exclusive(cls, download_dir: Path, filename: str) -> Path:
         """
-        Создает генератор для потоковой передачи видеофайла.
-        
-        Файл удаляется после отправки (однократное скачивание).
-        
-        Args:
-            video_path: Путь к видеофайлу
-        
-        Yields:
-            Байты видеофайла (chunks)
+        Атомарно создает пустой файл с указанным именем и возвращает его путь.
+
+        O_EXCL гарантирует уникальность: при коллизии к имени добавляется
+        номер (_1, _2, ...), как при прежней логике переименования.
         """
-        chunk_size = 8192  # 8KB chunks
-        try:
-            with open(video_path, mode="rb") as file:
-                while True:
-                    chunk = file.read(chunk_size)
-                    if not chunk:
-                        break
-                    yield chunk
-        finally:
-            # Удаляем файл после отправки (однократное скачивание)
-            if video_path.exists():
-                try:
-                    video_path.unlink()
-                except Exception:
-                    # Игнорируем ошибки при удалении (файл может быть занят)
-                    pass
+        stem = Path(filename).stem
+        candidate = download_dir / filename
+        counter = cls._collision_counters.get(stem, 1)
+        while True:
+            try:
+                fd = os.open(candidate, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            except FileExistsError:
+                candidate = download_dir / f"{stem}_{counter}.mp4"
+                counter += 1
+                cls._collision_counters[stem] = counter
+            else:
+                os.close(fd)
+                return candidate
+    
 